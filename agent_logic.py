@@ -1,17 +1,25 @@
 import os
+import asyncio
+import json
+import hashlib
+import threading
+import queue
+import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from langchain import hub
-from langchain.agents import create_react_agent, AgentExecutor
 from langchain_google_genai import ChatGoogleGenerativeAI
 from google.api_core.exceptions import ResourceExhausted
 
 load_dotenv() 
 
 from key_manager import ApiKeyManager
-from tools import google_search_tool, scrape_and_analyze_tool, youtube_transcript_tool, pdf_reader_tool
+from tools import (
+    google_search_tool, scrape_and_analyze_tool, scrape_urls_tool, youtube_transcript_tool, pdf_reader_tool,
+    scrape_and_analyze_async, youtube_transcript_async, pdf_reader_async, run_async, is_youtube_url
+)
 from database import (
-    setup_database, check_if_url_exists, add_url, get_cached_report, 
-    cache_report, get_seen_urls_for_topic
+    setup_database, check_if_url_exists, add_urls_bulk, get_cached_report, 
+    cache_report, get_seen_urls_for_topic, filter_unseen, get_cached_summary, cache_summary
 )
 
 # --- REVISED: PERSONA PROMPTS FOR MORE DIRECT INSTRUCTIONS ---
@@ -38,100 +46,264 @@ PERSONA_PROMPTS = {
     )
 }
 
+SYNTHESIS_TEMPLATE = """
+Your role is {role}.
+You have been given several research summaries about the topic: '{{topic}}'.
+Your task is to write {task_description}
+
+RESEARCH SUMMARIES:
+---
+{{summaries}}
+---
+
+Do not mention the summaries or that you are an AI. Write the final report directly.
+"""
+
+# Role and task are baked in per persona at import; requests only fill in topic and summaries.
+SYNTHESIS_TEMPLATES = {
+    persona.strip().lower(): SYNTHESIS_TEMPLATE.format(role=role, task_description=task_description)
+    for persona, (role, task_description) in PERSONA_PROMPTS.items()
+}
+if "default" not in SYNTHESIS_TEMPLATES:
+    raise ValueError("PERSONA_PROMPTS must define a 'default' persona.")
+
 # --- This setup code runs once when the application starts ---
 setup_database()
 key_manager = ApiKeyManager()
-all_tools = [google_search_tool, scrape_and_analyze_tool, youtube_transcript_tool, pdf_reader_tool]
+all_tools = [google_search_tool, scrape_and_analyze_tool, scrape_urls_tool, youtube_transcript_tool, pdf_reader_tool]
 
-def create_gemini_llm(api_key: str, temperature: float = 0.0):
-    """Helper function to create a Gemini LLM instance with a specific API key."""
+# Summary batches run concurrently; workers lease distinct keys from the key manager.
+MAX_ANALYSIS_WORKERS = 8
+
+# Sources are summarized together in one Gemini call; very large batches are split.
+BATCH_SUMMARY_PROMPT = (
+    "Summarize each of the following sources separately, covering the key points of each in one paragraph. "
+    "Return only a JSON array of objects with the keys \"url\" and \"summary\", one per source, in the order given.\n"
+)
+SOURCE_TEMPLATE = "\n\n===SOURCE {}===\nURL: {}\nCONTENT: {}\n"
+MAX_BATCH_CHARS = 500_000
+# Extracted text beyond this adds latency without improving the summary.
+MAX_CONTENT_CHARS = 200_000
+# Each source adds a summary to the reply, so batches are also capped by count to keep
+# the JSON answer well inside the model's output limit.
+MAX_BATCH_SOURCES = 4
+
+@functools.lru_cache(maxsize=len(key_manager.keys) * 2)
+def _llm_for(api_key: str, temp_bucket: int):
     return ChatGoogleGenerativeAI(
         model="gemini-1.5-flash",
         google_api_key=api_key,
-        temperature=temperature,
+        temperature=temp_bucket / 10,
         max_retries=0
     )
 
-def analyze_content_with_retry(url: str, topic: str, analysis_llm_instance):
-    # ... (This function is correct and does not need changes)
+def create_gemini_llm(api_key: str, temperature: float = 0.0):
+    """Helper function to get a Gemini LLM instance for a specific API key. Instances are reused per key and temperature."""
+    return _llm_for(api_key, round(temperature * 10))
+
+async def fetch_content_async(url: str):
+    """Extracts the text behind a URL; returns None on failure."""
     content_to_analyze = ""
-    if "youtube.com/watch" in url: content_to_analyze = youtube_transcript_tool.func(url)
-    elif url.lower().endswith('.pdf'): content_to_analyze = pdf_reader_tool.func(url)
-    else: content_to_analyze = scrape_and_analyze_tool.func(url)
+    if is_youtube_url(url): content_to_analyze = await youtube_transcript_async(url)
+    elif url.lower().endswith('.pdf'): content_to_analyze = await pdf_reader_async(url)
+    else: content_to_analyze = await scrape_and_analyze_async(url)
 
     if content_to_analyze and "Could not" not in content_to_analyze and "Failed" not in content_to_analyze:
-        add_url(url, topic)
-        summary_prompt = f"Summarize the key points of the following content in one paragraph:\n\n---{content_to_analyze}---"
-        for _ in range(len(key_manager.keys)):
-            try:
-                summary = analysis_llm_instance.invoke(summary_prompt).content
-                return f"Source: {url}\nSummary: {summary}\n---", analysis_llm_instance
-            except ResourceExhausted:
-                print(f"❗ Quota exhausted for analysis on key index {key_manager.current_key_index}. Retrying...")
-                new_key = key_manager.get_next_key()
-                analysis_llm_instance = create_gemini_llm(new_key, temperature=0)
-            except Exception as e:
-                print(f"-> Analysis failed for {url}: {e}")
-                return None, analysis_llm_instance
-        print(f"-> Analysis failed for {url}: All API keys are exhausted.")
-    return None, analysis_llm_instance
+        return content_to_analyze[:MAX_CONTENT_CHARS]
+    print(f"-> Skipping {url}: {content_to_analyze}")
+    return None
 
-def run_agent_task(topic: str, persona: str = "default") -> dict:
+async def fetch_contents_async(urls: list) -> list:
+    """Fetches every URL concurrently on the tools event loop; failed fetches come back as None."""
+    results = await asyncio.gather(*(fetch_content_async(url) for url in urls), return_exceptions=True)
+    return [None if isinstance(result, BaseException) else result for result in results]
+
+def content_hash(content: str) -> str:
+    """Key for the summary cache; summaries are temperature 0, so identical content gives the same summary."""
+    return hashlib.sha256(content.encode()).hexdigest()
+
+def chunk_sources(sources: list) -> list:
+    """Groups (url, content) pairs into batches of at most MAX_BATCH_SOURCES and MAX_BATCH_CHARS."""
+    batches, batch, batch_chars = [], [], 0
+    for url, content in sources:
+        if batch and (len(batch) >= MAX_BATCH_SOURCES or batch_chars + len(content) > MAX_BATCH_CHARS):
+            batches.append(batch)
+            batch, batch_chars = [], 0
+        batch.append((url, content))
+        batch_chars += len(content)
+    if batch:
+        batches.append(batch)
+    return batches
+
+def _parse_batch_summaries(raw: str) -> list:
+    text = raw.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    items = json.loads(text)
+    if not isinstance(items, list):
+        raise ValueError("expected a JSON array of summaries")
+    # Anything that isn't a {"url": str, "summary": str} object is dropped, so only
+    # strings reach the summary cache.
+    return [
+        (item["url"], item["summary"]) for item in items
+        if isinstance(item, dict) and isinstance(item.get("url"), str) and isinstance(item.get("summary"), str)
+    ]
+
+def summarize_sources(sources: list) -> list:
+    """Summarizes a batch of (url, content) pairs with a single Gemini call; returns (url, summary) pairs."""
+    batched_prompt = BATCH_SUMMARY_PROMPT + "".join(
+        SOURCE_TEMPLATE.format(k, url, content) for k, (url, content) in enumerate(sources, start=1)
+    )
+    for _ in range(len(key_manager.keys)):
+        try:
+            with key_manager.lease() as key_index:
+                raw = create_gemini_llm(key_manager.keys[key_index], temperature=0).invoke(batched_prompt).content
+            break
+        except ResourceExhausted as e:
+            print(f"❗ Quota exhausted for analysis: {e} Retrying...")
+        except Exception as e:
+            print(f"-> Analysis failed for {len(sources)} source(s): {e}")
+            return []
+    else:
+        print(f"-> Analysis failed for {len(sources)} source(s): All API keys are exhausted.")
+        return []
+
+    try:
+        items = _parse_batch_summaries(raw)
+    except (ValueError, TypeError, AttributeError):
+        if len(sources) == 1:
+            # A lone source often comes back as a plain paragraph instead of JSON.
+            return [(sources[0][0], raw.strip())]
+        print("-> Could not parse batched summaries. Summarizing sources individually...")
+        # A separate pool: this already runs on one of process_urls' executor workers.
+        with ThreadPoolExecutor(max_workers=len(sources)) as executor:
+            results = executor.map(lambda source: summarize_sources([source]), sources)
+            return [pair for pairs in results for pair in pairs]
+
+    by_url = {url: summary for url, summary in items if url and summary}
+    if not all(url in by_url for url, _ in sources) and len(items) == len(sources):
+        by_url = {url: summary for (url, _), (_, summary) in zip(sources, items) if summary}
+    return [(url, by_url[url]) for url, _ in sources if url in by_url]
+
+def _stream_synthesis(prompt: str, chunks: queue.Queue):
+    """
+    Streams the report into `chunks` under a key lease, then puts None. Runs on its own
+    thread so the lease is held only while Gemini generates, not while a slow client reads.
+    """
+    try:
+        with key_manager.lease() as key_index:
+            synthesis_llm = create_gemini_llm(key_manager.keys[key_index], temperature=0.1)
+            for chunk in synthesis_llm.stream(prompt):
+                if chunk.content:
+                    chunks.put(chunk.content)
+    except Exception as e:
+        chunks.put(e)
+    finally:
+        chunks.put(None)
+
+def iter_agent_events(topic: str, persona: str = "default"):
+    """
+    Runs the research pipeline, yielding progress events as dicts: a "summary" event per
+    summarized source, "token" events while the report streams in, and a final "done"
+    event carrying the report and its sources.
+    """
     cached_data = get_cached_report(topic, persona)
     if cached_data:
-        return cached_data
-
-    key_manager.current_key_index = 0
-    analysis_llm = create_gemini_llm(key_manager.get_current_key(), temperature=0)
+        yield {"type": "done", **cached_data}
+        return
 
     urls_to_process = [url for url in google_search_tool.func(query=topic) if isinstance(url, str)]
+    # URLs already analyzed for this topic are skipped; they come back only via the recovery path below.
+    urls_to_process = filter_unseen(urls_to_process, topic)
     
     all_summaries, successful_urls = [], []
+    seen_in_run: set[str] = set()
+    pending_urls = []
+    results_lock = threading.Lock()
+
+    def record_summary(url, summary):
+        with results_lock:
+            if url in seen_in_run:
+                return None
+            seen_in_run.add(url)
+            all_summaries.append(f"Source: {url}\nSummary: {summary}\n---")
+            successful_urls.append(url)
+        return {"type": "summary", "url": url}
 
     def process_urls(urls):
-        nonlocal analysis_llm
-        for url in urls:
-            if url not in successful_urls:
-                summary_text, updated_llm = analyze_content_with_retry(url, topic, analysis_llm)
-                analysis_llm = updated_llm
-                if summary_text:
-                    all_summaries.append(summary_text)
-                    successful_urls.append(url)
+        with results_lock:
+            pending = list(dict.fromkeys(url for url in urls if url not in seen_in_run))
+        if not pending:
+            return
+        sources, hashes = [], {}
+        for url, content in zip(pending, run_async(fetch_contents_async(pending))):
+            if not content:
+                continue
+            pending_urls.append((url, topic))
+            hashes[url] = content_hash(content)
+            summary = get_cached_summary(hashes[url])
+            if summary:
+                event = record_summary(url, summary)
+                if event:
+                    yield event
+            else:
+                sources.append((url, content))
+        if not sources:
+            return
+
+        with ThreadPoolExecutor(max_workers=MAX_ANALYSIS_WORKERS) as executor:
+            batch_futures = [executor.submit(summarize_sources, batch) for batch in chunk_sources(sources)]
+            for future in as_completed(batch_futures):
+                for url, summary in future.result():
+                    cache_summary(hashes[url], summary)
+                    event = record_summary(url, summary)
+                    if event:
+                        yield event
     
-    process_urls(urls_to_process)
+    yield from process_urls(urls_to_process)
 
     if not all_summaries:
         seen_urls = get_seen_urls_for_topic(topic)
         if seen_urls:
-            process_urls(seen_urls)
+            yield from process_urls(seen_urls)
+
+    # Every URL that yielded content is remembered in one write.
+    add_urls_bulk(pending_urls)
 
     if all_summaries:
         # --- REVISED: A much more direct and robust synthesis prompt ---
-        role, task_description = PERSONA_PROMPTS.get(persona, PERSONA_PROMPTS["default"])
-        
-        synthesis_prompt = f"""
-        Your role is {role}.
-        You have been given several research summaries about the topic: '{topic}'.
-        Your task is to write {task_description}
-
-        RESEARCH SUMMARIES:
-        ---
-        {"".join(all_summaries)}
-        ---
-
-        Do not mention the summaries or that you are an AI. Write the final report directly.
-        """
-        
-        synthesis_llm = create_gemini_llm(analysis_llm.google_api_key, temperature=0.1)
+        template = SYNTHESIS_TEMPLATES.get(persona.lower(), SYNTHESIS_TEMPLATES["default"])
+        synthesis_prompt = template.format(topic=topic, summaries="".join(all_summaries))
         
         try:
             # For the final synthesis, we can make a direct call instead of using the agent executor
             # This is faster and more reliable for this specific task.
-            final_report_text = synthesis_llm.invoke(synthesis_prompt).content
+            report_parts = []
+            chunks = queue.Queue()
+            threading.Thread(target=_stream_synthesis, args=(synthesis_prompt, chunks), daemon=True).start()
+            while (chunk := chunks.get()) is not None:
+                if isinstance(chunk, Exception):
+                    raise chunk
+                report_parts.append(chunk)
+                yield {"type": "token", "text": chunk}
+            final_report_text = "".join(report_parts)
             
             cache_report(topic, persona, final_report_text, successful_urls)
-            return {"report": final_report_text, "sources": successful_urls}
+            yield {"type": "done", "report": final_report_text, "sources": successful_urls}
         except Exception as e:
-            return {"report": f"Error during final synthesis: {e}", "sources": successful_urls}
+            yield {"type": "done", "report": f"Error during final synthesis: {e}", "sources": successful_urls}
+        return
     
-    return {"report": "No new or recoverable information was found to create a report.", "sources": []}
\ No newline at end of file
+    yield {"type": "done", "report": "No new or recoverable information was found to create a report.", "sources": []}
+
+def run_agent_task_streaming(topic: str, persona: str = "default"):
+    """Yields the pipeline's events formatted as Server-Sent Events."""
+    for event in iter_agent_events(topic, persona):
+        yield f"data: {json.dumps(event)}\n\n"
+
+def run_agent_task(topic: str, persona: str = "default") -> dict:
+    """Runs the pipeline to completion and returns the final report and its sources."""
+    for event in iter_agent_events(topic, persona):
+        if event["type"] == "done":
+            return {"report": event["report"], "sources": event["sources"]}
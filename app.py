@@ -1,5 +1,5 @@
-from flask import Flask, render_template, request, jsonify
-from agent_logic import run_agent_task
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
+from agent_logic import run_agent_task_streaming
 
 app = Flask(__name__)
 
@@ -17,9 +17,12 @@ def research():
     persona = data.get('persona', 'default')
     
     print(f"Received research request for topic: '{topic}' with persona: '{persona}'")
-    result_data = run_agent_task(topic, persona)
-    print(f"Sending report for topic: {topic}")
-    return jsonify(result_data)
+    # Progress and report tokens are streamed as Server-Sent Events while the agent works.
+    return Response(
+        stream_with_context(run_agent_task_streaming(topic, persona)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 if __name__ == '__main__':
     import os
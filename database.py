@@ -1,20 +1,59 @@
 import os
+import atexit
 import mysql.connector
 import json
 import sqlite3
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
 
 # Database configuration for MariaDB
-db_config = {
-    'host': os.getenv("DB_HOST"),
-    'user': os.getenv("DB_USER"),
-    'password': os.getenv("DB_PASSWORD"),
-    'database': os.getenv("DB_NAME")
-}
+def _read_db_config():
+    return {
+        'host': os.getenv("DB_HOST"),
+        'user': os.getenv("DB_USER"),
+        'password': os.getenv("DB_PASSWORD"),
+        'database': os.getenv("DB_NAME")
+    }
+
+db_config = _read_db_config()
 
 # SQLite fallback database path
 SQLITE_DB_PATH = "agent_memory.db"
 
+# Hot reports are served from process memory; the database stays the shared backing store.
+REPORT_MEMORY_CACHE_SIZE = 1024
+
+# Summaries are keyed by a hash of the summarized content and expire after a week.
+SUMMARY_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# SQLite connections are kept open and reused: a single writer plus a small pool of readers.
+SQLITE_READ_POOL_SIZE = 4
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA analysis_limit=400",
+)
+# Query-planner statistics are refreshed with PRAGMA optimize every this many checkouts.
+# It can run ANALYZE and so needs the write lock, so it runs when the writer is next returned.
+SQLITE_OPTIMIZE_EVERY = 1000
+
+_sqlite_write_pool = queue.Queue()
+_sqlite_read_pool = queue.Queue()
+_sqlite_pool_lock = threading.Lock()
+_sqlite_pool_ready = False
+_sqlite_checkouts = 0
+_sqlite_optimize_due = False
+
+_report_memory_cache = OrderedDict()
+_report_memory_cache_lock = threading.Lock()
+
 def get_db_connection():
     """Establishes a connection to the MariaDB database."""
     try:
@@ -24,24 +63,198 @@ def get_db_connection():
         return None
 
 def get_sqlite_connection():
-    """Establishes a connection to the SQLite fallback database."""
-    return sqlite3.connect(SQLITE_DB_PATH)
+    """Establishes a tuned, autocommit connection to the SQLite fallback database."""
+    conn = sqlite3.connect(SQLITE_DB_PATH, check_same_thread=False, isolation_level=None)
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
+    return conn
 
-def setup_database():
-    """Creates the tables if they don't exist in MariaDB or SQLite fallback."""
-    # Try MariaDB first
+def _init_sqlite_pool():
+    global _sqlite_pool_ready
+    with _sqlite_pool_lock:
+        if _sqlite_pool_ready:
+            return
+        # The writer connects first so WAL mode is in place before any reader opens the file.
+        _sqlite_write_pool.put(get_sqlite_connection())
+        for _ in range(SQLITE_READ_POOL_SIZE):
+            _sqlite_read_pool.put(get_sqlite_connection())
+        _sqlite_pool_ready = True
+
+@contextmanager
+def acquire(write: bool = False):
+    """Checks out a pooled SQLite connection for the duration of the block."""
+    if not _sqlite_pool_ready:
+        _init_sqlite_pool()
+    global _sqlite_checkouts, _sqlite_optimize_due
+    pool = _sqlite_write_pool if write else _sqlite_read_pool
+    conn = pool.get()
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        with _sqlite_pool_lock:
+            _sqlite_checkouts += 1
+            if _sqlite_checkouts % SQLITE_OPTIMIZE_EVERY == 0:
+                _sqlite_optimize_due = True
+            due = write and _sqlite_optimize_due
+            if due:
+                _sqlite_optimize_due = False
+        if due:
+            try:
+                conn.execute("PRAGMA optimize")
+            except sqlite3.Error as e:
+                print(f"Warning: PRAGMA optimize failed: {e}")
+        pool.put(conn)
+
+def _close_sqlite_pool():
+    """Runs a final PRAGMA optimize and closes every pooled connection at process exit."""
+    global _sqlite_pool_ready
+    with _sqlite_pool_lock:
+        if not _sqlite_pool_ready:
+            return
+        _sqlite_pool_ready = False
+    for pool in (_sqlite_write_pool, _sqlite_read_pool):
+        while True:
+            try:
+                conn = pool.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                if pool is _sqlite_write_pool:
+                    conn.execute("PRAGMA optimize")
+                conn.close()
+            except sqlite3.Error as e:
+                print(f"Warning: Failed to close SQLite connection cleanly: {e}")
+
+atexit.register(_close_sqlite_pool)
+
+def _try_mariadb_once():
+    """Probes MariaDB a single time. Skipped entirely when DB_HOST is not configured."""
+    if not db_config["host"]:
+        return False
     conn = get_db_connection()
-    if conn:
+    if conn is None:
+        return False
+    conn.close()
+    return True
+
+# The backend is chosen once at import instead of re-probing MariaDB on every query.
+_backend = "mariadb" if _try_mariadb_once() else "sqlite"
+
+def reconfigure_backend():
+    """Re-reads the DB_* environment variables and probes MariaDB again. Returns the active backend."""
+    global _backend
+    db_config.update(_read_db_config())
+    _backend = "mariadb" if _try_mariadb_once() else "sqlite"
+    print(f"Database backend: {_backend}")
+    return _backend
+
+@contextmanager
+def _cursor(write: bool = False):
+    """Yields a cursor on the active backend. MariaDB writes are committed on exit."""
+    if _backend == "mariadb":
+        conn = mysql.connector.connect(**db_config)
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            if write:
+                conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+        return
+
+    with acquire(write) as conn:
         cursor = conn.cursor()
         try:
+            # Pooled connections are autocommit; writes get an explicit transaction so
+            # multi-row statements cost a single commit. IMMEDIATE takes the write lock up
+            # front, so a busy database is waited on (the connect timeout) instead of failing when
+            # a read inside the transaction later upgrades to a write.
+            if write:
+                cursor.execute("BEGIN IMMEDIATE")
+            yield cursor
+            if write:
+                cursor.execute("COMMIT")
+        finally:
+            cursor.close()
+
+def _sql(query: str) -> str:
+    """Queries are written with SQLite '?' placeholders; MariaDB expects '%s'."""
+    return query.replace("?", "%s") if _backend == "mariadb" else query
+
+# --- Schema Migrations ---
+
+def _migrate_seen_urls_mariadb(cursor):
+    """Swaps the old (url, topic) unique key for (topic, url) so topic lookups can use it."""
+    cursor.execute("SHOW INDEX FROM seen_urls WHERE Key_name = 'unique_url_topic'")
+    if cursor.fetchall():
+        print("Migrating seen_urls unique key to (topic, url)")
+        cursor.execute("""
+            ALTER TABLE seen_urls
+            DROP INDEX `unique_url_topic`,
+            ADD UNIQUE KEY `unique_topic_url` (`topic`,`url`(255))
+        """)
+
+def _migrate_seen_urls_sqlite(cursor):
+    """Rebuilds seen_urls if it still carries the old UNIQUE(url, topic) constraint."""
+    cursor.execute("PRAGMA index_list(seen_urls)")
+    unique_indexes = [row[1] for row in cursor.fetchall() if row[2]]
+    for index_name in unique_indexes:
+        cursor.execute(f"PRAGMA index_info('{index_name}')")
+        columns = [row[2] for row in sorted(cursor.fetchall())]
+        if columns == ["url", "topic"]:
+            break
+    else:
+        return
+
+    # SQLite cannot alter a table constraint in place, so copy into a fresh table.
+    print("Migrating seen_urls unique constraint to (topic, url)")
+    cursor.execute('''
+        CREATE TABLE seen_urls_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            UNIQUE(topic, url)
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO seen_urls_new (id, url, topic) SELECT id, url, topic FROM seen_urls")
+    cursor.execute("DROP TABLE seen_urls")
+    cursor.execute("ALTER TABLE seen_urls_new RENAME TO seen_urls")
+
+def _migrate_report_sources(cursor):
+    """Moves sources stored as JSON on synthesis_cache rows into synthesis_cache_sources."""
+    cursor.execute("SELECT id, sources FROM synthesis_cache WHERE sources IS NOT NULL")
+    rows = cursor.fetchall()
+    if not rows:
+        return
+    print(f"Migrating sources for {len(rows)} cached report(s) into synthesis_cache_sources")
+    for cache_id, sources_json in rows:
+        try:
+            sources = json.loads(sources_json)
+        except (json.JSONDecodeError, TypeError):
+            print("Warning: Failed to parse sources from cache. Treating as empty.")
+            sources = []
+        cursor.executemany(
+            _sql("INSERT INTO synthesis_cache_sources (cache_id, url, ord) VALUES (?, ?, ?)"),
+            [(cache_id, url, ord_) for ord_, url in enumerate(sources)]
+        )
+        cursor.execute(_sql("UPDATE synthesis_cache SET sources = NULL WHERE id = ?"), (cache_id,))
+
+def setup_database():
+    """Creates the tables if they don't exist in MariaDB or SQLite fallback."""
+    if _backend == "mariadb":
+        with _cursor(write=True) as cursor:
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS seen_urls (
                     id INT AUTO_INCREMENT PRIMARY KEY,
                     url VARCHAR(2048) NOT NULL,
                     topic VARCHAR(255) NOT NULL,
-                    UNIQUE KEY `unique_url_topic` (`url`(255),`topic`)
+                    UNIQUE KEY `unique_topic_url` (`topic`,`url`(255))
                 )
             ''')
+            _migrate_seen_urls_mariadb(cursor)
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS synthesis_cache (
                     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -52,26 +265,37 @@ def setup_database():
                     UNIQUE KEY `unique_topic_persona` (`topic`,`persona`)
                 )
             ''')
-            conn.commit()
-            print("MariaDB tables created successfully")
-        finally:
-            cursor.close()
-            conn.close()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS synthesis_cache_sources (
+                    cache_id INT NOT NULL,
+                    url VARCHAR(2048) NOT NULL,
+                    ord INT NOT NULL,
+                    KEY `idx_cache_sources` (`cache_id`,`ord`)
+                )
+            ''')
+            _migrate_report_sources(cursor)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS summary_cache (
+                    content_sha256 CHAR(64) PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    created_at BIGINT NOT NULL
+                )
+            ''')
+        print("MariaDB tables created successfully")
         return
     
-    # Fallback to SQLite
     print("Using SQLite fallback database")
-    conn = get_sqlite_connection()
-    cursor = conn.cursor()
-    try:
+    with _cursor(write=True) as cursor:
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS seen_urls (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 url TEXT NOT NULL,
                 topic TEXT NOT NULL,
-                UNIQUE(url, topic)
+                UNIQUE(topic, url)
             )
         ''')
+        _migrate_seen_urls_sqlite(cursor)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_seen_urls_topic ON seen_urls(topic)")
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS synthesis_cache (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -82,163 +306,171 @@ def setup_database():
                 UNIQUE(topic, persona)
             )
         ''')
-        conn.commit()
-        print("SQLite tables created successfully")
-    finally:
-        cursor.close()
-        conn.close()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS synthesis_cache_sources (
+                cache_id INTEGER NOT NULL REFERENCES synthesis_cache(id),
+                url TEXT NOT NULL,
+                ord INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_cache_sources ON synthesis_cache_sources(cache_id, ord)")
+        _migrate_report_sources(cursor)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS summary_cache (
+                content_sha256 TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                created_at INTEGER NOT NULL
+            )
+        ''')
+    print("SQLite tables created successfully")
+
+def optimize_database():
+    """
+    Refreshes the query planner's statistics for the active backend. SQLite does this on its own
+    every SQLITE_OPTIMIZE_EVERY checkouts; MariaDB deployments should run it from a nightly job.
+    """
+    if _backend == "mariadb":
+        with _cursor() as cursor:
+            cursor.execute("ANALYZE TABLE seen_urls, synthesis_cache, synthesis_cache_sources, summary_cache")
+            cursor.fetchall()
+        return
+    with acquire(write=True) as conn:
+        conn.execute("PRAGMA optimize")
 
 # --- URL Memory Functions ---
 
 def check_if_url_exists(url: str, topic: str):
     """Checks if a URL for a specific topic is already in the database."""
-    # Try MariaDB first
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        try:
-            cursor.execute("SELECT id FROM seen_urls WHERE url = %s AND topic = %s", (url, topic.lower()))
-            result = cursor.fetchone()
-            return result is not None
-        finally:
-            cursor.close()
-            conn.close()
-    
-    # Fallback to SQLite
-    conn = get_sqlite_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("SELECT id FROM seen_urls WHERE url = ? AND topic = ?", (url, topic.lower()))
-        result = cursor.fetchone()
-        return result is not None
-    finally:
-        cursor.close()
-        conn.close()
+    with _cursor() as cursor:
+        cursor.execute(_sql("SELECT id FROM seen_urls WHERE url = ? AND topic = ?"), (url, topic.lower()))
+        return cursor.fetchone() is not None
 
 def add_url(url: str, topic: str):
-    """Adds a new URL for a specific topic to the database."""
-    if not check_if_url_exists(url, topic):
-        # Try MariaDB first
-        conn = get_db_connection()
-        if conn:
-            cursor = conn.cursor()
-            try:
-                cursor.execute("INSERT INTO seen_urls (url, topic) VALUES (%s, %s)", (url, topic.lower()))
-                conn.commit()
-                return
-            finally:
-                cursor.close()
-                conn.close()
-        
-        # Fallback to SQLite
-        conn = get_sqlite_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute("INSERT OR IGNORE INTO seen_urls (url, topic) VALUES (?, ?)", (url, topic.lower()))
-            conn.commit()
-        finally:
-            cursor.close()
-            conn.close()
+    """Adds a new URL for a specific topic to the database. Duplicates are ignored by the unique key."""
+    if _backend == "mariadb":
+        query = "INSERT IGNORE INTO seen_urls (url, topic) VALUES (%s, %s)"
+    else:
+        query = "INSERT OR IGNORE INTO seen_urls (url, topic) VALUES (?, ?)"
+    with _cursor(write=True) as cursor:
+        cursor.execute(query, (url, topic.lower()))
+
+def add_urls_bulk(pairs: list):
+    """Adds many (url, topic) pairs in a single transaction. Duplicates are ignored by the unique key."""
+    if not pairs:
+        return
+    rows = [(url, topic.lower()) for url, topic in pairs]
+    if _backend == "mariadb":
+        query = "INSERT IGNORE INTO seen_urls (url, topic) VALUES (%s, %s)"
+    else:
+        query = "INSERT OR IGNORE INTO seen_urls (url, topic) VALUES (?, ?)"
+    with _cursor(write=True) as cursor:
+        cursor.executemany(query, rows)
+
+def filter_unseen(urls: list, topic: str) -> list:
+    """Returns the URLs not yet recorded for a topic, in their original order, using one query."""
+    if not urls:
+        return []
+    placeholders = ",".join("?" * len(urls))
+    with _cursor() as cursor:
+        cursor.execute(_sql(f"SELECT url FROM seen_urls WHERE topic = ? AND url IN ({placeholders})"), (topic.lower(), *urls))
+        seen = {row[0] for row in cursor.fetchall()}
+    return [url for url in urls if url not in seen]
 
 def get_seen_urls_for_topic(topic: str):
     """Retrieves all previously seen URLs for a specific topic."""
-    # Try MariaDB first
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor()
-        try:
-            cursor.execute("SELECT url FROM seen_urls WHERE topic = %s", (topic.lower(),))
-            results = cursor.fetchall()
-            return [row[0] for row in results]
-        finally:
-            cursor.close()
-            conn.close()
-    
-    # Fallback to SQLite
-    conn = get_sqlite_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("SELECT url FROM seen_urls WHERE topic = ?", (topic.lower(),))
-        results = cursor.fetchall()
-        return [row[0] for row in results]
-    finally:
-        cursor.close()
-        conn.close()
+    with _cursor() as cursor:
+        cursor.execute(_sql("SELECT url FROM seen_urls WHERE topic = ?"), (topic.lower(),))
+        return [row[0] for row in cursor.fetchall()]
 
 # --- Synthesis Cache Functions ---
 
+def _remember_report(key: tuple, report: dict):
+    with _report_memory_cache_lock:
+        _report_memory_cache[key] = report
+        _report_memory_cache.move_to_end(key)
+        if len(_report_memory_cache) > REPORT_MEMORY_CACHE_SIZE:
+            _report_memory_cache.popitem(last=False)
+
+def _copy_report(report: dict) -> dict:
+    return {'report': report['report'], 'sources': list(report['sources'])}
+
 def get_cached_report(topic: str, persona: str):
-    """Retrievels a cached report and safely handles JSON parsing."""
-    # Try MariaDB first
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        try:
-            cursor.execute("SELECT report, sources FROM synthesis_cache WHERE topic = %s AND persona = %s", (topic.lower(), persona.lower()))
-            result = cursor.fetchone()
-            
-            if result and result.get('sources'):
-                try:
-                    result['sources'] = json.loads(result['sources'])
-                except (json.JSONDecodeError, TypeError):
-                    print("Warning: Failed to parse sources from cache. Treating as empty.")
-                    result['sources'] = []
-            return result
-        finally:
-            cursor.close()
-            conn.close()
+    """Retrievels a cached report with its sources, from process memory when possible."""
+    key = (topic.lower(), persona.lower())
+    with _report_memory_cache_lock:
+        report = _report_memory_cache.get(key)
+        if report is not None:
+            _report_memory_cache.move_to_end(key)
+            return _copy_report(report)
+
+    # One row per source, in order; a report without sources comes back as a single row with a NULL url.
+    with _cursor() as cursor:
+        cursor.execute(_sql("""
+            SELECT s.report, src.url
+            FROM synthesis_cache s
+            LEFT JOIN synthesis_cache_sources src ON src.cache_id = s.id
+            WHERE s.topic = ? AND s.persona = ?
+            ORDER BY src.ord
+        """), key)
+        rows = cursor.fetchall()
     
-    # Fallback to SQLite
-    conn = get_sqlite_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("SELECT report, sources FROM synthesis_cache WHERE topic = ? AND persona = ?", (topic.lower(), persona.lower()))
-        result = cursor.fetchone()
-        
-        if result:
-            result_dict = {'report': result[0], 'sources': result[1]}
-            if result_dict.get('sources'):
-                try:
-                    result_dict['sources'] = json.loads(result_dict['sources'])
-                except (json.JSONDecodeError, TypeError):
-                    print("Warning: Failed to parse sources from cache. Treating as empty.")
-                    result_dict['sources'] = []
-            return result_dict
+    if not rows:
         return None
-    finally:
-        cursor.close()
-        conn.close()
+    result_dict = {'report': rows[0][0], 'sources': [url for _, url in rows if url is not None]}
+    _remember_report(key, _copy_report(result_dict))
+    return result_dict
 
 def cache_report(topic: str, persona: str, report: str, sources: list):
-    """Saves a new report to the cache with sources as a proper JSON string."""
-    sources_json = json.dumps(sources)
-    
-    # Try MariaDB first
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor()
-        try:
-            query = """
-            INSERT INTO synthesis_cache (topic, persona, report, sources) 
-            VALUES (%s, %s, %s, %s) 
-            ON DUPLICATE KEY UPDATE report = VALUES(report), sources = VALUES(sources)
-            """
-            cursor.execute(query, (topic.lower(), persona.lower(), report, sources_json))
-            conn.commit()
-            return
-        finally:
-            cursor.close()
-            conn.close()
-    
-    # Fallback to SQLite
-    conn = get_sqlite_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("""
-            INSERT OR REPLACE INTO synthesis_cache (topic, persona, report, sources) 
-            VALUES (?, ?, ?, ?)
-        """, (topic.lower(), persona.lower(), report, sources_json))
-        conn.commit()
-    finally:
-        cursor.close()
-        conn.close()
\ No newline at end of file
+    """Saves a new report to the cache, replacing its sources in synthesis_cache_sources."""
+    key = (topic.lower(), persona.lower())
+    if _backend == "mariadb":
+        query = """
+        INSERT INTO synthesis_cache (topic, persona, report, sources) 
+        VALUES (%s, %s, %s, NULL) 
+        ON DUPLICATE KEY UPDATE report = VALUES(report), sources = NULL
+        """
+    else:
+        # An upsert keeps the row id stable, so no source rows are orphaned the way INSERT OR REPLACE would.
+        query = """
+        INSERT INTO synthesis_cache (topic, persona, report, sources) 
+        VALUES (?, ?, ?, NULL) 
+        ON CONFLICT(topic, persona) DO UPDATE SET report = excluded.report, sources = NULL
+        """
+    with _cursor(write=True) as cursor:
+        cursor.execute(query, (*key, report))
+        cursor.execute(_sql("SELECT id FROM synthesis_cache WHERE topic = ? AND persona = ?"), key)
+        cache_id = cursor.fetchone()[0]
+        cursor.execute(_sql("DELETE FROM synthesis_cache_sources WHERE cache_id = ?"), (cache_id,))
+        cursor.executemany(
+            _sql("INSERT INTO synthesis_cache_sources (cache_id, url, ord) VALUES (?, ?, ?)"),
+            [(cache_id, url, ord_) for ord_, url in enumerate(sources)]
+        )
+    _remember_report(key, {'report': report, 'sources': list(sources)})
+
+# --- Summary Cache Functions ---
+
+def get_cached_summary(content_sha256: str, max_age: int = SUMMARY_CACHE_TTL_SECONDS):
+    """Returns the stored summary for a content hash, or None if missing or older than `max_age` seconds."""
+    with _cursor() as cursor:
+        cursor.execute(
+            _sql("SELECT summary FROM summary_cache WHERE content_sha256 = ? AND created_at >= ?"),
+            (content_sha256, int(time.time()) - max_age)
+        )
+        result = cursor.fetchone()
+    return result[0] if result else None
+
+def cache_summary(content_sha256: str, summary: str):
+    """Stores the summary for a content hash, replacing any older entry."""
+    if _backend == "mariadb":
+        query = """
+        INSERT INTO summary_cache (content_sha256, summary, created_at) 
+        VALUES (%s, %s, %s) 
+        ON DUPLICATE KEY UPDATE summary = VALUES(summary), created_at = VALUES(created_at)
+        """
+    else:
+        query = """
+        INSERT OR REPLACE INTO summary_cache (content_sha256, summary, created_at) 
+        VALUES (?, ?, ?)
+        """
+    with _cursor(write=True) as cursor:
+        cursor.execute(query, (content_sha256, summary, int(time.time())))
@@ -0,0 +1,12 @@
+import os
+
+# Research requests spend nearly all of their time waiting on search, scraping and Gemini,
+# so each worker serves many of them at once on threads. Threads (rather than gevent
+# greenlets) keep the tools' background asyncio loop and the agent's thread pools working.
+# API key leases and cooldowns are tracked per process, so workers stay few: every extra
+# worker is another ApiKeyManager that can't see keys the others found exhausted.
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 50))
+timeout = 300
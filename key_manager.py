@@ -1,9 +1,18 @@
 import os
+import threading
+import time
+from google.api_core.exceptions import ResourceExhausted
+
+# Gemini quotas are enforced per minute, so an exhausted key is parked at least this long.
+# Repeated exhaustion doubles the cooldown, up to the maximum.
+KEY_COOLDOWN_SECONDS = 60
+MAX_KEY_COOLDOWN_SECONDS = 15 * 60
 
 class ApiKeyManager:
     """
     Manages a list of API keys to rotate through when quota limits are hit.
     This version automatically discovers numbered API keys from environment variables.
+    Keys can also be leased to concurrent workers so each call runs against its own quota.
     """
     def __init__(self):
         self.keys = []
@@ -20,6 +29,11 @@ class ApiKeyManager:
             raise ValueError("No API keys found. Please set GEMINI_API_KEY_1, etc., in your .env file.")
         
         self.current_key_index = 0
+        self.cooldown: dict[int, float] = {}
+        self._strikes: dict[int, int] = {}
+        self._in_use = set()
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(len(self.keys))
         print(f"🔑 ApiKeyManager initialized with {len(self.keys)} numbered Gemini keys.")
 
     def get_current_key(self):
@@ -27,7 +41,75 @@ class ApiKeyManager:
         return self.keys[self.current_key_index]
 
     def get_next_key(self):
-        """Rotates to the next key and returns it."""
-        self.current_key_index = (self.current_key_index + 1) % len(self.keys)
+        """Rotates to the next key that is not cooling down (or the one that recovers soonest) and returns it."""
+        with self._lock:
+            now = time.time()
+            candidates = [(self.current_key_index + step) % len(self.keys) for step in range(1, len(self.keys) + 1)]
+            ready = [i for i in candidates if self.cooldown.get(i, 0) <= now]
+            self.current_key_index = ready[0] if ready else min(candidates, key=lambda i: self.cooldown.get(i, 0))
         print(f"🔄 Switching to API key index: {self.current_key_index}")
-        return self.get_current_key()
\ No newline at end of file
+        return self.get_current_key()
+
+    def mark_exhausted(self, index):
+        """Puts a key on cooldown, doubling the wait each time it is exhausted again in a row."""
+        with self._lock:
+            strikes = self._strikes.get(index, 0) + 1
+            self._strikes[index] = strikes
+            wait = min(KEY_COOLDOWN_SECONDS * 2 ** (strikes - 1), MAX_KEY_COOLDOWN_SECONDS)
+            self.cooldown[index] = time.time() + wait
+        print(f"❄️ API key index {index} exhausted; cooling down for {wait}s.")
+
+    def lease(self):
+        """
+        Checks out a key for exclusive use: `with key_manager.lease() as key_index:`.
+        Blocks while every key is leased, and waits at most KEY_COOLDOWN_SECONDS for a
+        cooling key; past that the lease raises ResourceExhausted instead. A
+        ResourceExhausted raised inside the block puts the key on cooldown before it
+        is returned to the pool.
+        """
+        return _KeyLease(self)
+
+    def _acquire(self):
+        self._slots.acquire()
+        with self._lock:
+            now = time.time()
+            free = [i for i in range(len(self.keys)) if i not in self._in_use]
+            ready = [i for i in free if self.cooldown.get(i, 0) <= now]
+            index = ready[0] if ready else min(free, key=lambda i: self.cooldown.get(i, 0))
+            self._in_use.add(index)
+            wait = self.cooldown.get(index, 0) - now
+        if wait > KEY_COOLDOWN_SECONDS:
+            # Too long to stall a request thread for; the caller reports the keys as exhausted.
+            # The key's strikes are kept so its backoff keeps escalating.
+            with self._lock:
+                self._in_use.discard(index)
+            self._slots.release()
+            raise ResourceExhausted(f"All available API keys are cooling down; the soonest recovers in {wait:.0f}s.")
+        if wait > 0:
+            # Every free key is cooling down: wait once for the soonest instead of burning requests on dead keys.
+            print(f"⏳ All available API keys are cooling down; waiting {wait:.0f}s for key index {index}.")
+            time.sleep(wait)
+        return index
+
+    def _release(self, index, exhausted=False):
+        if exhausted:
+            self.mark_exhausted(index)
+        with self._lock:
+            if not exhausted:
+                self._strikes.pop(index, None)
+            self._in_use.discard(index)
+        self._slots.release()
+
+class _KeyLease:
+    def __init__(self, manager):
+        self.manager = manager
+        self.index = None
+
+    def __enter__(self):
+        self.index = self.manager._acquire()
+        return self.index
+
+    def __exit__(self, exc_type, exc, tb):
+        exhausted = exc_type is not None and issubclass(exc_type, ResourceExhausted)
+        self.manager._release(self.index, exhausted)
+        return False
@@ -4,8 +4,6 @@ from dotenv import load_dotenv
 
 load_dotenv() 
 
-from langchain import hub
-from langchain.agents import create_react_agent, AgentExecutor
 from langchain_openai import ChatOpenAI
 
 from tools import google_search_tool, scrape_and_analyze_tool, youtube_transcript_tool, pdf_reader_tool
@@ -72,11 +70,6 @@ def main():
         }
     )
     
-    all_tools = [google_search_tool, scrape_and_analyze_tool, youtube_transcript_tool, pdf_reader_tool]
-    prompt = hub.pull("hwchase17/react")
-    synthesis_agent_runnable = create_react_agent(llm, all_tools, prompt)
-    synthesis_agent_executor = AgentExecutor(agent=synthesis_agent_runnable, tools=all_tools, verbose=False, handle_parsing_errors=True)
-
     print("\n--- 🧠 Dynamic Topic Sentinel Agent v8.5 (Typo Fix) ---")
     print("Enter a topic to research, or type 'quit' to exit.")
 
@@ -119,16 +112,17 @@ def main():
         # --- Final Synthesis Step ---
         if all_summaries:
             print("\n\n✨ All sources summarized. Now synthesizing a final report...")
+            joined_summaries = "\n".join(all_summaries)
             synthesis_prompt = f"""
             Synthesize the following summaries into a single, cohesive answer for the query: "{topic}"
             Summaries:
-            {"\n".join(all_summaries)}
+            {joined_summaries}
             Provide a final, comprehensive answer. Combine the insights.
             """
 
             try:
-                final_report_obj = synthesis_agent_executor.invoke({"input": synthesis_prompt})
-                final_report_text = final_report_obj.get('output', 'Could not generate final report.')
+                # Synthesis never needs tools, so call the LLM directly instead of a ReAct agent.
+                final_report_text = llm.invoke(synthesis_prompt).content
                 print("\n--- 📈 Final Intelligence Briefing ---"); print(final_report_text)
                 cache_report(topic, final_report_text)
                 print("\n✅ Report has been cached for future instant access.")
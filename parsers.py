@@ -0,0 +1,56 @@
+import threading
+from lxml import etree, html as lxml_html
+import pypdfium2 as pdfium
+
+# --- Text extraction for fetched pages and PDFs ---
+# These run in the tools CPU pool's worker processes, which unpickle them by module
+# reference. Keep this module free of heavy imports so workers load only the parsers.
+
+# Tools hand back at most this much extracted text.
+MAX_TEXT_CHARS = 8000
+
+# Paragraphs are selected by a precompiled XPath and their text is gathered by libxml2,
+# so no Python-level tree walk is needed.
+_PARAGRAPHS = etree.XPath('//p')
+
+def html_to_text(content: bytes, clean_url: str) -> str:
+    try:
+        doc = lxml_html.document_fromstring(content)
+    except (etree.ParserError, ValueError):
+        return f"Could not extract sufficient text content from {clean_url}."
+    parts, total_len = [], 0
+    for paragraph in _PARAGRAPHS(doc):
+        parts.append(paragraph.text_content())
+        total_len += len(parts[-1]) + 1
+        if total_len >= MAX_TEXT_CHARS:
+            break
+    text = "\n".join(parts)
+    if not text or len(text.strip()) < 150:
+        return f"Could not extract sufficient text content from {clean_url}."
+    return text[:MAX_TEXT_CHARS]
+
+# PDFium is not thread-safe, so each process extracts one document at a time; concurrent
+# PDFs are spread across the CPU pool's worker processes instead of threads.
+_PDFIUM_LOCK = threading.Lock()
+
+def pdf_to_text(content: bytes) -> str:
+    text_parts, total_len = [], 0
+    with _PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(content)
+        try:
+            for i in range(len(pdf)):
+                page = pdf[i]
+                textpage = page.get_textpage()
+                text_parts.append(textpage.get_text_range())
+                textpage.close()
+                page.close()
+                total_len += len(text_parts[-1])
+                # Later pages would be truncated away anyway.
+                if total_len >= MAX_TEXT_CHARS:
+                    break
+        finally:
+            pdf.close()
+    text = "".join(text_parts)
+    if not text:
+        return "Could not extract any text from the PDF."
+    return text[:MAX_TEXT_CHARS]
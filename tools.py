@@ -1,11 +1,321 @@
 import os
-import io
+import re
+import asyncio
+import threading
+import time
+import contextlib
+from email.utils import parsedate_to_datetime
+from collections import OrderedDict
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import requests
-from bs4 import BeautifulSoup
-from PyPDF2 import PdfReader
-from youtube_transcript_api import YouTubeTranscriptApi
+import httpx
+from diskcache import Cache, Timeout
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urlparse, urlunparse, parse_qs, parse_qsl, urlencode
+from youtube_transcript_api import YouTubeTranscriptApi, NoTranscriptFound
 from langchain.tools import tool
 from googleapiclient.discovery import build
+from parsers import MAX_TEXT_CHARS, html_to_text, pdf_to_text
+
+# --- URL cleaning ---
+# Quotes and whitespace that LLM-produced tool arguments tend to wrap URLs in.
+# Only the ends are trimmed: apostrophes are legal inside URLs (e.g. Wikipedia titles).
+_URL_STRIP_CHARS = "'\" \t\r\n"
+
+def _clean_url(url: str) -> str:
+    return url.strip(_URL_STRIP_CHARS)
+
+# --- Shared HTTP clients ---
+# Pages and PDFs go through one pooled HTTP/2 client: a single TLS connection per origin
+# multiplexes many requests, and servers without HTTP/2 fall back to HTTP/1.1 automatically.
+_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+_CLIENT = httpx.Client(
+    transport=httpx.HTTPTransport(http2=True, limits=_HTTP_LIMITS, retries=2),
+    headers={'User-Agent': 'Mozilla/5.0'},
+    timeout=15.0,
+    follow_redirects=True
+)
+
+# youtube-transcript-api is built on requests, so transcripts keep a pooled requests session.
+_YT_SESSION = requests.Session()
+_YT_SESSION.headers.update({'User-Agent': 'Mozilla/5.0'})
+_adapter = HTTPAdapter(
+    pool_connections=20,
+    pool_maxsize=50,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+)
+_YT_SESSION.mount("http://", _adapter)
+_YT_SESSION.mount("https://", _adapter)
+_YT_API = YouTubeTranscriptApi(http_client=_YT_SESSION)
+
+# --- YouTube URLs ---
+_YOUTUBE_HOSTS = {"youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com", "youtu.be", "www.youtu.be"}
+_YOUTUBE_PATH_ID = re.compile(r"^/(?:shorts|embed|live|v)/([A-Za-z0-9_-]{11})")
+_YOUTUBE_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+def extract_youtube_video_id(url: str):
+    """Returns the video id from watch, youtu.be, shorts, embed and live URLs, or None."""
+    parsed = urlparse(_clean_url(url))
+    host = (parsed.hostname or "").lower()
+    if host not in _YOUTUBE_HOSTS:
+        return None
+    if host.endswith("youtu.be"):
+        candidate = parsed.path.lstrip("/").split("/")[0]
+    elif parsed.path == "/watch":
+        candidate = parse_qs(parsed.query).get("v", [""])[0]
+    else:
+        match = _YOUTUBE_PATH_ID.match(parsed.path)
+        candidate = match.group(1) if match else ""
+    return candidate if _YOUTUBE_ID.match(candidate) else None
+
+def is_youtube_url(url: str) -> bool:
+    return extract_youtube_video_id(url) is not None
+
+# --- Fetch cache ---
+# Extracted text is cached on disk per URL. Once an entry expires, its ETag/Last-Modified
+# validators are kept a while longer so the next fetch can be a cheap conditional GET.
+# Gunicorn workers share the directory, so a locked cache is skipped after a short wait
+# rather than stalling fetches for diskcache's default 60s.
+_CACHE = Cache('.scrape_cache', size_limit=2**30, timeout=1)
+HTML_CACHE_TTL = 6 * 60 * 60
+PDF_CACHE_TTL = 24 * 60 * 60
+# Transcripts are immutable, so they are cached by video id for much longer.
+TRANSCRIPT_CACHE_TTL = 30 * 24 * 60 * 60
+VALIDATOR_CACHE_TTL = 7 * 24 * 60 * 60
+
+def _cache_lookup(kind: str, clean_url: str, force_refresh: bool = False):
+    """Returns (fresh_text, conditional_request_headers, stale_text) for a URL."""
+    if force_refresh:
+        return None, {}, None
+    try:
+        fresh = _CACHE.get((kind, clean_url))
+        if fresh is not None:
+            return fresh, {}, None
+        validators = _CACHE.get(("validators", kind, clean_url))
+    except Timeout:
+        return None, {}, None
+    if validators is None:
+        return None, {}, None
+    etag, last_modified, stale = validators
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    return None, headers, stale
+
+def _cache_store(kind: str, clean_url: str, text: str, response_headers, ttl: int) -> str:
+    """Caches successfully extracted text along with the response's validators; returns the text."""
+    if text.startswith("Could not"):
+        return text
+    etag, last_modified = response_headers.get('ETag'), response_headers.get('Last-Modified')
+    try:
+        _CACHE.set((kind, clean_url), text, expire=ttl)
+        if etag or last_modified:
+            _CACHE.set(("validators", kind, clean_url), (etag, last_modified, text), expire=VALIDATOR_CACHE_TTL)
+    except Timeout:
+        pass
+    return text
+
+# --- Shared async fetch machinery ---
+# One background event loop drives every async fetch, so the pooled HTTP/2 client
+# (and its open connections) is reused across agent runs instead of per asyncio.run().
+_async_loop = None
+_async_loop_lock = threading.Lock()
+_async_client = None
+
+def _get_async_loop():
+    global _async_loop
+    with _async_loop_lock:
+        if _async_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="tools-event-loop", daemon=True).start()
+            _async_loop = loop
+    return _async_loop
+
+def run_async(coro):
+    """Runs a coroutine on the shared tools event loop and blocks until it finishes."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_async_loop()).result()
+
+def _get_async_client():
+    # Only ever called from the tools event loop, so no lock is needed.
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(http2=True, limits=_HTTP_LIMITS, retries=2),
+            headers={'User-Agent': 'Mozilla/5.0'},
+            timeout=15.0,
+            follow_redirects=True
+        )
+    return _async_client
+
+# At most HOST_CONCURRENCY requests are in flight per origin, so one busy site (or YouTube)
+# isn't flooded into throttling us. A 429 is waited out once when its Retry-After is short.
+HOST_CONCURRENCY = 4
+MAX_RETRY_AFTER_SECONDS = 30
+# Past this many tracked hosts, semaphores nobody holds are dropped; they carry no state.
+MAX_TRACKED_HOSTS = 256
+_host_sems = {}
+
+def _host_semaphore(url: str) -> asyncio.Semaphore:
+    # Only ever called from the tools event loop, so no lock is needed.
+    host = (urlparse(url).hostname or "").lower()
+    sem = _host_sems.get(host)
+    if sem is None:
+        if len(_host_sems) >= MAX_TRACKED_HOSTS:
+            for idle_host in [h for h, s in _host_sems.items() if s._value == HOST_CONCURRENCY and not s._waiters]:
+                del _host_sems[idle_host]
+        sem = _host_sems[host] = asyncio.Semaphore(HOST_CONCURRENCY)
+    return sem
+
+def _retry_after_seconds(response):
+    """Returns how long to wait before retrying a 429, or None if it shouldn't be retried."""
+    if response.status_code != 429:
+        return None
+    value = response.headers.get('Retry-After', '1').strip()
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            delay = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    if delay > MAX_RETRY_AFTER_SECONDS:
+        return None
+    return max(delay, 0.0)
+
+@contextlib.asynccontextmanager
+async def _host_stream(client, url: str, headers: dict):
+    """Streams a GET under the host's concurrency limit, waiting out one short 429."""
+    async with _host_semaphore(url):
+        for attempt in range(2):
+            async with client.stream("GET", url, headers=headers) as response:
+                delay = _retry_after_seconds(response) if attempt == 0 else None
+                if delay is None:
+                    yield response
+                    return
+            # The slot stays held while waiting, so the whole host backs off.
+            await asyncio.sleep(delay)
+
+# HTML/PDF parsing is CPU-bound, so it runs in worker processes: off the event loop and
+# outside the GIL. Workers are spawned rather than forked because the parent is threaded,
+# and the parse functions live in parsers.py so a worker doesn't import this module.
+CPU_POOL_WORKERS = min(4, os.cpu_count() or 1)
+_cpu_pool = None
+_cpu_pool_lock = threading.Lock()
+
+def _get_cpu_pool():
+    global _cpu_pool
+    with _cpu_pool_lock:
+        if _cpu_pool is None:
+            _cpu_pool = ProcessPoolExecutor(max_workers=CPU_POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _cpu_pool
+
+def _discard_cpu_pool(pool):
+    # A worker died (e.g. a crash inside a native parser); start a fresh pool for later calls.
+    global _cpu_pool
+    with _cpu_pool_lock:
+        if _cpu_pool is pool:
+            _cpu_pool = None
+    pool.shutdown(wait=False)
+
+async def _parse_off_loop(func, *args):
+    pool = _get_cpu_pool()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+    except BrokenProcessPool:
+        _discard_cpu_pool(pool)
+        raise
+
+# Only the first MAX_TEXT_CHARS of text are kept, so bodies are streamed and cut off early.
+# Oversized PDFs are fetched with a Range request for just their head.
+MAX_HTML_BYTES = 2 * 1024 * 1024
+MAX_PDF_BYTES = 20 * 1024 * 1024
+PDF_RANGE_BYTES = 2 * 1024 * 1024
+
+def _read_capped(response, limit: int) -> bytes:
+    body = bytearray()
+    for chunk in response.iter_bytes(16384):
+        body += chunk
+        if len(body) >= limit:
+            break
+    return bytes(body[:limit])
+
+async def _aread_capped(response, limit: int) -> bytes:
+    body = bytearray()
+    async for chunk in response.aiter_bytes(16384):
+        body += chunk
+        if len(body) >= limit:
+            break
+    return bytes(body[:limit])
+
+def _pdf_request_plan(content_length) -> tuple:
+    """Returns (extra_request_headers, byte_limit) for a PDF of the size reported by HEAD."""
+    try:
+        size = int(content_length or 0)
+    except ValueError:
+        size = 0
+    if size > MAX_PDF_BYTES:
+        return {'Range': f"bytes=0-{PDF_RANGE_BYTES - 1}"}, PDF_RANGE_BYTES
+    return {}, MAX_PDF_BYTES
+
+# --- Google Custom Search ---
+# The discovery client is built once per thread from the bundled discovery document
+# (the underlying httplib2 transport is not thread-safe), and results are memoized briefly.
+SEARCH_CACHE_TTL = 15 * 60
+SEARCH_CACHE_SIZE = 512
+_cse_local = threading.local()
+_search_cache = OrderedDict()
+_search_cache_lock = threading.Lock()
+
+def _get_cse_service():
+    service = getattr(_cse_local, "service", None)
+    if service is None:
+        service = build(
+            "customsearch", "v1",
+            developerKey=os.getenv("GOOGLE_API_KEY"),
+            cache_discovery=False,
+            static_discovery=True
+        )
+        _cse_local.service = service
+    return service
+
+def _cached_search(key: tuple):
+    with _search_cache_lock:
+        entry = _search_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, links = entry
+        if expires_at < time.time():
+            del _search_cache[key]
+            return None
+        _search_cache.move_to_end(key)
+        return list(links)
+
+def _remember_search(key: tuple, links: list):
+    with _search_cache_lock:
+        _search_cache[key] = (time.time() + SEARCH_CACHE_TTL, list(links))
+        _search_cache.move_to_end(key)
+        if len(_search_cache) > SEARCH_CACHE_SIZE:
+            _search_cache.popitem(last=False)
+
+_TRACKING_PARAMS = {"fbclid", "gclid"}
+
+def _normalize_url(url: str) -> str:
+    """Canonical form used to spot duplicate search results: tracking params, fragments, trailing slashes and scheme ignored."""
+    parsed = urlparse(url)
+    query = urlencode([
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in _TRACKING_PARAMS
+    ])
+    return urlunparse(("", parsed.netloc.lower(), parsed.path.rstrip("/"), parsed.params, query, ""))
+
+def _dedupe_urls(links: list) -> list:
+    seen = set()
+    return [url for url in links if (key := _normalize_url(url)) not in seen and not seen.add(key)]
 
 @tool
 def google_search_tool(query: str) -> list:
@@ -14,73 +324,155 @@ def google_search_tool(query: str) -> list:
     excluding PDF files. Returns a list of URLs.
     """
     search_query = f"{query} -filetype:pdf"
+    cache_key = (search_query, 'd1')
+    cached = _cached_search(cache_key)
+    if cached is not None:
+        print(f"Using cached search results for query: '{search_query}'")
+        return cached
     print(f"Executing search with query: '{search_query}'")
     
     try:
-        service = build("customsearch", "v1", developerKey=os.getenv("GOOGLE_API_KEY"))
-        res = service.cse().list(
+        res = _get_cse_service().cse().list(
             q=search_query,
             cx=os.getenv("GOOGLE_CSE_ID"),
             dateRestrict='d1',
             num=5
         ).execute()
         
-        if 'items' not in res:
-            return []
-            
-        return [item['link'] for item in res['items']]
+        links = _dedupe_urls([item['link'] for item in res.get('items', [])])
+        _remember_search(cache_key, links)
+        return links
     except Exception as e:
         print(f"An error occurred with the Google Search tool: {e}")
         return []
 
 @tool
-def scrape_and_analyze_tool(url: str) -> str:
+def scrape_and_analyze_tool(url: str, force_refresh: bool = False) -> str:
     """
     Scrapes text content from a standard webpage URL.
     Returns the extracted text content for analysis.
+    Set force_refresh to bypass the scrape cache.
     """
-    clean_url = url.strip().strip("'\"")
+    clean_url = _clean_url(url)
+    cached, headers, stale = _cache_lookup("html", clean_url, force_refresh)
+    if cached is not None:
+        return cached
     try:
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        response = requests.get(clean_url, headers=headers, timeout=15)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        paragraphs = soup.find_all('p')
-        content = "\n".join([p.get_text() for p in paragraphs])
-        if not content or len(content.strip()) < 150:
-            return f"Could not extract sufficient text content from {clean_url}."
-        return content[:8000]
+        with _CLIENT.stream("GET", clean_url, headers=headers) as response:
+            if response.status_code == 304 and stale is not None:
+                return _cache_store("html", clean_url, stale, response.headers, HTML_CACHE_TTL)
+            response.raise_for_status()
+            content = _read_capped(response, MAX_HTML_BYTES)
+        return _cache_store("html", clean_url, html_to_text(content, clean_url), response.headers, HTML_CACHE_TTL)
     except Exception as e:
         return f"An error occurred while scraping {clean_url}: {e}"
 
 @tool
-def youtube_transcript_tool(url: str) -> str:
+def youtube_transcript_tool(url: str, force_refresh: bool = False) -> str:
     """
     Fetches the transcript of a YouTube video.
+    Set force_refresh to bypass the transcript cache.
     """
-    clean_url = url.strip().strip("'\"")
-    video_id = clean_url.split("v=")[-1].split("&")[0]
+    clean_url = _clean_url(url)
+    video_id = extract_youtube_video_id(clean_url)
+    if video_id is None:
+        return f"Could not find a YouTube video id in {clean_url}."
+    cached, _, _ = _cache_lookup("transcript", video_id, force_refresh)
+    if cached is not None:
+        return cached
     try:
-        transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
-        transcript_text = " ".join([item['text'] for item in transcript_list])
-        return transcript_text[:8000]
+        try:
+            transcript = _YT_API.fetch(video_id)
+        except NoTranscriptFound:
+            # No English track: fall back to whatever transcript the video has.
+            transcript = next(iter(_YT_API.list(video_id))).fetch()
+        transcript_text = " ".join(snippet.text for snippet in transcript)
+        return _cache_store("transcript", video_id, transcript_text[:MAX_TEXT_CHARS], {}, TRANSCRIPT_CACHE_TTL)
     except Exception as e:
         return f"Could not retrieve transcript for YouTube video {video_id}: {e}"
 
 @tool
-def pdf_reader_tool(url: str) -> str:
+def pdf_reader_tool(url: str, force_refresh: bool = False) -> str:
     """
     Downloads a PDF from a URL and extracts its text content.
+    Set force_refresh to bypass the PDF cache.
     """
-    clean_url = url.strip().strip("'\"")
+    clean_url = _clean_url(url)
+    cached, headers, stale = _cache_lookup("pdf", clean_url, force_refresh)
+    if cached is not None:
+        return cached
+    try:
+        try:
+            head = _CLIENT.head(clean_url)
+            range_headers, limit = _pdf_request_plan(head.headers.get('Content-Length'))
+        except httpx.HTTPError:
+            range_headers, limit = _pdf_request_plan(None)
+        with _CLIENT.stream("GET", clean_url, headers={**headers, **range_headers}) as response:
+            if response.status_code == 304 and stale is not None:
+                return _cache_store("pdf", clean_url, stale, response.headers, PDF_CACHE_TTL)
+            response.raise_for_status()
+            content = _read_capped(response, limit)
+        return _cache_store("pdf", clean_url, pdf_to_text(content), response.headers, PDF_CACHE_TTL)
+    except Exception as e:
+        return f"Failed to read or process the PDF from {clean_url}: {e}"
+
+# --- Async variants used by the agent's fetch stage (run them with run_async) ---
+# The disk cache is SQLite-backed, so its reads and writes go through to_thread to keep
+# them off the shared event loop.
+
+async def scrape_and_analyze_async(url: str, force_refresh: bool = False) -> str:
+    """Async counterpart of scrape_and_analyze_tool."""
+    clean_url = _clean_url(url)
+    cached, headers, stale = await asyncio.to_thread(_cache_lookup, "html", clean_url, force_refresh)
+    if cached is not None:
+        return cached
+    try:
+        async with _host_stream(_get_async_client(), clean_url, headers) as response:
+            if response.status_code == 304 and stale is not None:
+                return await asyncio.to_thread(_cache_store, "html", clean_url, stale, response.headers, HTML_CACHE_TTL)
+            response.raise_for_status()
+            content = await _aread_capped(response, MAX_HTML_BYTES)
+        text = await _parse_off_loop(html_to_text, content, clean_url)
+        return await asyncio.to_thread(_cache_store, "html", clean_url, text, response.headers, HTML_CACHE_TTL)
+    except Exception as e:
+        return f"An error occurred while scraping {clean_url}: {e}"
+
+async def pdf_reader_async(url: str, force_refresh: bool = False) -> str:
+    """Async counterpart of pdf_reader_tool."""
+    clean_url = _clean_url(url)
+    cached, headers, stale = await asyncio.to_thread(_cache_lookup, "pdf", clean_url, force_refresh)
+    if cached is not None:
+        return cached
     try:
-        response = requests.get(clean_url, timeout=15)
-        response.raise_for_status()
-        pdf_file = io.BytesIO(response.content)
-        reader = PdfReader(pdf_file)
-        text = "".join(page.extract_text() or "" for page in reader.pages)
-        if not text:
-            return "Could not extract any text from the PDF."
-        return text[:8000]
+        client = _get_async_client()
+        try:
+            async with _host_semaphore(clean_url):
+                head = await client.head(clean_url)
+            range_headers, limit = _pdf_request_plan(head.headers.get('Content-Length'))
+        except httpx.HTTPError:
+            range_headers, limit = _pdf_request_plan(None)
+        async with _host_stream(client, clean_url, {**headers, **range_headers}) as response:
+            if response.status_code == 304 and stale is not None:
+                return await asyncio.to_thread(_cache_store, "pdf", clean_url, stale, response.headers, PDF_CACHE_TTL)
+            response.raise_for_status()
+            content = await _aread_capped(response, limit)
+        text = await _parse_off_loop(pdf_to_text, content)
+        return await asyncio.to_thread(_cache_store, "pdf", clean_url, text, response.headers, PDF_CACHE_TTL)
     except Exception as e:
-        return f"Failed to read or process the PDF from {clean_url}: {e}"
\ No newline at end of file
+        return f"Failed to read or process the PDF from {clean_url}: {e}"
+
+async def youtube_transcript_async(url: str, force_refresh: bool = False) -> str:
+    """Async counterpart of youtube_transcript_tool; the transcript client is blocking, so it runs in a thread."""
+    async with _host_semaphore("https://www.youtube.com/"):
+        return await asyncio.to_thread(youtube_transcript_tool.func, url, force_refresh)
+
+async def _scrape_urls_async(urls: list) -> list:
+    return await asyncio.gather(*(scrape_and_analyze_async(url) for url in urls))
+
+@tool
+def scrape_urls_tool(urls: list) -> list:
+    """
+    Scrapes text content from several standard webpage URLs at once.
+    Returns the extracted text for each URL, in the same order as the input.
+    """
+    return run_async(_scrape_urls_async([url for url in urls if isinstance(url, str)]))